@@ -4,16 +4,45 @@ AI Document Parser
 Supports: images, PDFs (OCR), CSV files + multi-currency
 """
 import os
+import sys
 import json
+import time
 import base64
+import hashlib
+from copy import deepcopy
+from collections import OrderedDict
 import requests
-import pandas as pd
 from PIL import Image
 from dotenv import load_dotenv
 from io import StringIO, BytesIO
+from datetime import date
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 load_dotenv()
 
+# pandas (and numpy with it) cost hundreds of ms at import — defer them so
+# Streamlit's hot-reload loop doesn't pay that on every cold import
+pd = None
+np = None
+
+
+def _lazy_pandas() -> None:
+    global pd, np
+    if pd is None:
+        import numpy
+        import pandas
+        np, pd = numpy, pandas
+
+
+# orjson parses the LLM JSON payloads ~2-3x faster than stdlib json;
+# fall back cleanly when it isn't installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 
 # ─────────────────────────────────────────────
 # API Key helpers — read from .env OR st.secrets
@@ -65,7 +94,11 @@ def _groq_text(prompt: str) -> str:
 # ─────────────────────────────────────────────
 # Gemini client (vision — for images)
 # ─────────────────────────────────────────────
+# Fastest candidate first — fallbacks are only probed when a call actually fails
+_MODEL_CANDIDATES = ["gemini-2.0-flash-lite", "gemini-1.5-flash", "gemini-1.5-flash-latest"]
 _gemini_model = None
+_extraction_config = None
+
 
 def _get_gemini():
     global _gemini_model
@@ -79,13 +112,49 @@ def _get_gemini():
         )
     import google.generativeai as genai
     genai.configure(api_key=GEMINI_API_KEY)
-    for name in ["gemini-1.5-flash", "gemini-2.0-flash-lite", "gemini-1.5-flash-latest"]:
-        try:
-            _gemini_model = genai.GenerativeModel(name)
-            return _gemini_model
-        except Exception:
-            continue
-    raise RuntimeError("Could not initialize Gemini model.")
+    _gemini_model = genai.GenerativeModel(_MODEL_CANDIDATES[0])
+    return _gemini_model
+
+
+def _get_extraction_config():
+    """JSON-mode generation config for extraction calls (no markdown fences to strip)."""
+    global _extraction_config
+    if _extraction_config is None:
+        import google.generativeai as genai
+        _extraction_config = genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=TRANSACTION_SCHEMA,
+            temperature=0,
+        )
+    return _extraction_config
+
+
+def _gemini_generate(parts, **kwargs):
+    """generate_content with lazy model fallback.
+
+    Constructing a GenerativeModel never fails — only the call does — so
+    fallbacks are stepped through on error (quota, model retired) and the
+    model that answered is kept for all subsequent calls.
+    """
+    global _gemini_model
+    try:
+        return _get_gemini().generate_content(parts, **kwargs)
+    except Exception:
+        # Without a key the probe loop can only fail with the SDK's generic
+        # "set GOOGLE_API_KEY" error — keep _get_gemini's setup guidance instead
+        if not GEMINI_API_KEY:
+            raise
+        import google.generativeai as genai
+        last_err = None
+        for name in _MODEL_CANDIDATES[1:]:
+            try:
+                model = genai.GenerativeModel(name)
+                resp = model.generate_content(parts, **kwargs)
+                _gemini_model = model
+                return resp
+            except Exception as e:
+                last_err = e
+        raise RuntimeError(f"All Gemini models failed: {last_err}")
 
 
 # ─────────────────────────────────────────────
@@ -116,6 +185,33 @@ Rules:
 - Return ONLY the JSON"""
 
 
+# Gemini response schema matching EXTRACTION_PROMPT — with JSON mode +
+# schema the model returns guaranteed JSON, no fence stripping needed
+TRANSACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "doc_type": {"type": "string"},
+        "currency": {"type": "string"},
+        "summary": {"type": "string"},
+        "transactions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "date": {"type": "string"},
+                    "description": {"type": "string"},
+                    "amount": {"type": "number"},
+                    "category": {"type": "string"},
+                    "type": {"type": "string", "enum": ["expense", "income"]},
+                },
+                "required": ["date", "description", "amount", "category", "type"],
+            },
+        },
+    },
+    "required": ["doc_type", "currency", "summary", "transactions"],
+}
+
+
 def _clean_json(raw: str) -> dict:
     raw = raw.strip()
     if "```" in raw:
@@ -123,17 +219,24 @@ def _clean_json(raw: str) -> dict:
         if raw.startswith("json"):
             raw = raw[4:]
     raw = raw.strip().rstrip("`").strip()
-    return json.loads(raw)
+    return _json_loads(raw)
 
 
 # ─────────────────────────────────────────────
 # ✨ Public parse functions
 # ─────────────────────────────────────────────
-def parse_document(image: Image.Image) -> dict:
-    """Parse image using Gemini Vision (requires GEMINI_API_KEY)."""
-    model = _get_gemini()
-    response = model.generate_content([EXTRACTION_PROMPT, image])
-    return _clean_json(response.text)
+def parse_document(image) -> dict:
+    """Parse image(s) using Gemini Vision (requires GEMINI_API_KEY).
+
+    Accepts a single PIL image or a list of page images; multiple pages
+    go out in ONE API call so we pay model latency once per document.
+    """
+    images = image if isinstance(image, list) else [image]
+    prompt = EXTRACTION_PROMPT
+    if len(images) > 1:
+        prompt += "\n- The images are pages of ONE document — merge transactions from ALL pages"
+    response = _gemini_generate([prompt, *images], generation_config=_get_extraction_config())
+    return _json_loads(response.text)
 
 
 def parse_text_document(text: str) -> dict:
@@ -141,75 +244,360 @@ def parse_text_document(text: str) -> dict:
     prompt = f"{EXTRACTION_PROMPT}\n\nDocument text:\n{text[:4000]}"
     if GROQ_API_KEY:
         return _clean_json(_groq_text(prompt))
-    model = _get_gemini()
-    return _clean_json(model.generate_content(prompt).text)
+    return _json_loads(_gemini_generate(prompt, generation_config=_get_extraction_config()).text)
+
+
+# ─────────────────────────────────────────────
+# Parse cache — re-uploading the same file skips the OCR/LLM pipeline
+# ─────────────────────────────────────────────
+_PARSE_CACHE_MAX = 64
+_parse_cache: OrderedDict = OrderedDict()
+
+
+def _parse_cache_get(file_bytes: bytes) -> dict | None:
+    key = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+    if key in _parse_cache:
+        _parse_cache.move_to_end(key)
+        return deepcopy(_parse_cache[key])   # callers mutate the result
+    return None
+
+
+def _parse_cache_put(file_bytes: bytes, result: dict) -> None:
+    key = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+    _parse_cache[key] = deepcopy(result)
+    if len(_parse_cache) > _PARSE_CACHE_MAX:
+        _parse_cache.popitem(last=False)     # evict least-recently-used
+
+
+def _extract_embedded_text(file_bytes: bytes) -> str:
+    """Pull embedded text from born-digital PDFs — no rasterizing, no Tesseract."""
+    try:
+        from pypdf import PdfReader
+        reader = PdfReader(BytesIO(file_bytes))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    except Exception:
+        return ""
+
+
+# LSTM engine with uniform-block segmentation — faster than Tesseract's
+# default auto page-segmentation on table-shaped financial documents
+_TESSERACT_CONFIG = "--oem 1 --psm 6"
+
+# A page is trusted when Tesseract's own word confidences back it up;
+# untrusted pages get routed to Gemini vision instead
+_OCR_MIN_CONF   = 60
+_OCR_MIN_TOKENS = 20
+
+
+def _ocr_page(img) -> tuple[str, bool]:
+    """OCR one page, returning (text, trusted) judged by per-word confidence."""
+    import pytesseract
+    _lazy_pandas()
+    data = pytesseract.image_to_data(
+        img, lang="eng", config=_TESSERACT_CONFIG, output_type=pytesseract.Output.DICT
+    )
+    lines, confs = {}, []
+    for i, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+        confs.append(float(data["conf"][i]))
+    text = "\n".join(" ".join(words) for words in lines.values())
+    trusted = len(confs) > _OCR_MIN_TOKENS and float(np.mean(confs)) > _OCR_MIN_CONF
+    return text, trusted
+
+
+def _ocr_images(images: list) -> list:
+    """OCR pages concurrently — Tesseract runs as a subprocess, so threads overlap cleanly.
+
+    Returns one (text, trusted) tuple per page, in page order.
+    """
+    try:
+        workers = int(os.getenv("OCR_CONCURRENCY", os.cpu_count() or 1))
+    except ValueError:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(images)))
+    if workers == 1:
+        return [_ocr_page(img) for img in images]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_ocr_page, images))
+
+
+# Pages per rasterization batch — small enough that OCR on batch N overlaps
+# with pdftoppm rendering batch N+1, big enough to amortize process startup
+_PAGE_BATCH = 4
+
+
+def _rasterize_and_ocr(file_bytes: bytes, tmpdir: str):
+    """Pipeline rasterization and OCR for multi-page PDFs.
+
+    A producer thread renders page batches into a bounded queue while the
+    consumer OCRs each batch as it lands, so the two stages overlap instead
+    of running strictly one after the other. Returns (images, page_results)
+    where page_results is one (text, trusted) tuple per page.
+    """
+    import queue
+    import threading
+    from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+
+    thread_count = max(1, (os.cpu_count() or 1) - 1)
+    n_pages = int(pdfinfo_from_bytes(file_bytes)["Pages"])
+    if n_pages <= _PAGE_BATCH:
+        images = convert_from_bytes(
+            file_bytes, dpi=200, grayscale=True,
+            thread_count=thread_count, fmt="jpeg", output_folder=tmpdir,
+        )
+        return images, _ocr_images(images)
+
+    q: queue.Queue = queue.Queue(maxsize=2)
+    sentinel = object()
+    produce_error = []
+
+    def produce():
+        try:
+            for start in range(1, n_pages + 1, _PAGE_BATCH):
+                q.put(convert_from_bytes(
+                    file_bytes, dpi=200, grayscale=True,
+                    first_page=start, last_page=min(start + _PAGE_BATCH - 1, n_pages),
+                    thread_count=thread_count, fmt="jpeg", output_folder=tmpdir,
+                ))
+        except Exception as e:
+            produce_error.append(e)
+        finally:
+            q.put(sentinel)
+
+    threading.Thread(target=produce, daemon=True).start()
+    images, pages = [], []
+    while True:
+        batch = q.get()
+        if batch is sentinel:
+            break
+        images.extend(batch)
+        pages.extend(_ocr_images(batch))   # OCR this batch while the next renders
+    if produce_error:
+        raise produce_error[0]
+    return images, pages
 
 
 def parse_pdf_file(file_bytes: bytes) -> dict:
-    """Parse PDF: OCR → text → Groq. Falls back to Gemini vision."""
+    """Parse PDF: embedded text → OCR → Groq. Falls back to Gemini vision."""
+    cached = _parse_cache_get(file_bytes)
+    if cached is not None:
+        return cached
+    result = _parse_pdf_uncached(file_bytes)
+    _parse_cache_put(file_bytes, result)
+    return result
+
+
+def _parse_pdf_uncached(file_bytes: bytes) -> dict:
+    # Born-digital PDFs carry their own text — skip the whole OCR pipeline
+    embedded = _extract_embedded_text(file_bytes)
+    if len("".join(embedded.split())) > 200:
+        return parse_text_document(embedded)
     try:
         from pdf2image import convert_from_bytes
         import pytesseract
-        images = convert_from_bytes(file_bytes, dpi=300)
-        full_text = "\n".join(pytesseract.image_to_string(img, lang="eng") for img in images)
-        if len(full_text.strip()) > 50:
-            return parse_text_document(full_text)
-        # OCR got nothing — try Gemini Vision on first page
-        return parse_document(images[0])
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmpdir:
+            images, pages = _rasterize_and_ocr(file_bytes, tmpdir)
+            # Only confidence-backed pages count toward the text path
+            good_text = "\n".join(text for text, trusted in pages if trusted)
+            if len(good_text.strip()) > 50:
+                return parse_text_document(good_text)
+            # OCR couldn't be trusted — send exactly the unreadable pages to vision
+            low_conf = [img for img, (_, trusted) in zip(images, pages) if not trusted] or images
+            return parse_document(low_conf[:8])
     except ImportError:
         return parse_text_document("PDF document — extract financial transactions if any.")
     except Exception as e:
         raise Exception(f"PDF parsing error: {e}")
 
 
+# Column-role keywords for CSV header detection — built once at module load
+_COLUMN_KEYWORDS = {
+    "date":   ("date", "datum", "fecha"),
+    "desc":   ("desc", "detail", "merchant", "payee", "beskrivning"),
+    "amount": ("amount", "value", "sum", "belopp", "cantidad"),
+    "type":   ("type", "typ"),
+    "cat":    ("category", "kategori"),
+}
+
+
+def _detect_columns(columns) -> dict:
+    """One pass over the header, mapping each role to its first matching column."""
+    found = {}
+    for col in columns:
+        for role, keys in _COLUMN_KEYWORDS.items():
+            if role not in found and any(k in col for k in keys):
+                found[role] = col
+    return found
+
+
+def _classify_columns(df) -> dict:
+    """Guess column roles from content when header keywords fail.
+
+    Scores each column on a small sample: date-like (parseable as dates,
+    not as plain numbers), numeric, and free-text (long strings). Much
+    cheaper than the LLM fallback for headerless/odd-header exports.
+    """
+    sample = df.head(50)
+    scores = {}
+    for col in df.columns:
+        s = sample[col].astype(str)
+        num_score  = pd.to_numeric(
+            s.str.replace(",", ".", regex=False).str.replace(" ", "", regex=False),
+            errors="coerce",
+        ).notna().mean()
+        date_score = pd.to_datetime(sample[col], errors="coerce", format="mixed").notna().mean() if num_score < 0.8 else 0.0
+        text_len   = s.str.len().mean()
+        scores[col] = {"date": date_score, "num": num_score, "text": text_len}
+
+    found = {}
+    date_candidates = [c for c in df.columns if scores[c]["date"] > 0.8]
+    if date_candidates:
+        found["date"] = max(date_candidates, key=lambda c: scores[c]["date"])
+    num_candidates = [c for c in df.columns if c != found.get("date") and scores[c]["num"] > 0.8]
+    if num_candidates:
+        found["amount"] = max(num_candidates, key=lambda c: scores[c]["num"])
+    text_candidates = [
+        c for c in df.columns
+        if c not in found.values() and scores[c]["num"] < 0.5 and scores[c]["text"] > 5
+    ]
+    if text_candidates:
+        found["desc"] = max(text_candidates, key=lambda c: scores[c]["text"])
+    return found
+
+
 def parse_csv_file(file_content: str) -> dict:
     """Auto-detect CSV columns or fall back to AI parsing."""
+    raw = file_content.encode("utf-8", errors="ignore")
+    cached = _parse_cache_get(raw)
+    if cached is not None:
+        return cached
+    result = _parse_csv_uncached(file_content)
+    _parse_cache_put(raw, result)
+    return result
+
+
+def _parse_csv_uncached(file_content: str) -> dict:
+    _lazy_pandas()
     try:
         df = pd.read_csv(StringIO(file_content))
         df.columns = df.columns.str.strip().str.lower()
-        date_col   = next((c for c in df.columns if any(k in c for k in ["date","datum","fecha"])), None)
-        desc_col   = next((c for c in df.columns if any(k in c for k in ["desc","detail","merchant","payee","beskrivning"])), None)
-        amount_col = next((c for c in df.columns if any(k in c for k in ["amount","value","sum","belopp","cantidad"])), None)
-        type_col   = next((c for c in df.columns if any(k in c for k in ["type","typ"])), None)
-        cat_col    = next((c for c in df.columns if any(k in c for k in ["category","kategori"])), None)
+        cols = _detect_columns(df.columns)
+        date_col   = cols.get("date")
+        desc_col   = cols.get("desc")
+        amount_col = cols.get("amount")
+        type_col   = cols.get("type")
+        cat_col    = cols.get("cat")
 
         if not date_col or not amount_col:
-            return _parse_csv_with_ai(file_content)
-
-        transactions = []
-        for _, row in df.iterrows():
-            try:
-                amount = float(str(row[amount_col]).replace(",", ".").replace(" ", ""))
-                if type_col:
-                    tx_type = "expense" if any(k in str(row[type_col]).lower() for k in ["expense","debit","debet"]) else "income"
-                else:
-                    tx_type = "expense" if amount < 0 else "income"
-                transactions.append({
-                    "date": str(row[date_col]),
-                    "description": str(row[desc_col]) if desc_col else "Transaction",
-                    "amount": abs(amount),
-                    "category": str(row[cat_col]) if cat_col else "Other",
-                    "type": tx_type,
-                })
-            except Exception:
-                continue
+            if not cols:
+                # No keyword matched anything — likely a headerless export, and
+                # read_csv has consumed the first transaction as the "header".
+                # Re-read with every row as data so that row isn't lost.
+                df = pd.read_csv(StringIO(file_content), header=None)
+                df.columns = df.columns.astype(str)
+            # Content-based classification first — only pay for the LLM when ambiguous
+            guessed = _classify_columns(df)
+            date_col   = date_col or guessed.get("date")
+            amount_col = amount_col or guessed.get("amount")
+            desc_col   = desc_col or guessed.get("desc")
+            if not date_col or not amount_col:
+                return _parse_csv_with_ai(file_content)
+
+        # Vectorized build — pandas does the per-row work in C instead of Python
+        amount = pd.to_numeric(
+            df[amount_col].astype(str).str.replace(",", ".", regex=False).str.replace(" ", "", regex=False),
+            errors="coerce",
+        )
+        if type_col:
+            is_expense = df[type_col].astype(str).str.lower().str.contains("expense|debit|debet", na=False)
+        else:
+            is_expense = amount < 0
+        # Categorical type/category columns: to_dict('records') then emits the
+        # handful of shared (interned) label objects instead of a str per row
+        tx_type = pd.Categorical.from_codes(
+            np.where(is_expense.to_numpy(), 0, 1), categories=[_EXPENSE, _INCOME]
+        )
+        if cat_col:
+            category = df[cat_col].astype(str)
+            category = category.where(category.isin(VALID_CATEGORIES), "Other").astype("category")
+        else:
+            category = "Other"
+        result = pd.DataFrame({
+            "date": df[date_col].astype(str),
+            "description": df[desc_col].astype(str) if desc_col else "Transaction",
+            "amount": amount.abs(),
+            "category": category,
+            "type": tx_type,
+        })
+        transactions = result.dropna(subset=["amount"]).to_dict("records")
         return {"doc_type": "csv", "currency": "SEK", "summary": f"CSV with {len(transactions)} transactions", "transactions": transactions}
     except Exception:
         return _parse_csv_with_ai(file_content)
 
 
+def _sample_csv_for_ai(csv_content: str) -> str:
+    """Header + first rows + a uniform row sample for the LLM.
+
+    A raw byte-prefix can cut mid-row and over-weights the head of the
+    file; sampling keeps the token budget while covering the full schema.
+    """
+    _lazy_pandas()
+    try:
+        df = pd.read_csv(StringIO(csv_content), nrows=200)
+        if len(df) > 20:
+            df = pd.concat([df.head(5), df.iloc[5:].sample(15, random_state=0)])
+        return df.to_csv(index=False)
+    except Exception:
+        return csv_content[:3000]
+
+
 def _parse_csv_with_ai(csv_content: str) -> dict:
-    prompt = f"{EXTRACTION_PROMPT}\n\nCSV file:\n{csv_content[:3000]}"
+    prompt = f"{EXTRACTION_PROMPT}\n\nCSV file:\n{_sample_csv_for_ai(csv_content)}"
     if GROQ_API_KEY:
         return _clean_json(_groq_text(prompt))
-    model = _get_gemini()
-    return _clean_json(model.generate_content(prompt).text)
+    return _json_loads(_gemini_generate(prompt, generation_config=_get_extraction_config()).text)
 
 
 # ─────────────────────────────────────────────
 # ✨ Multi-currency
 # ─────────────────────────────────────────────
-_fx_cache: dict = {}
+# Pooled session — reuses the TCP/TLS connection to frankfurter.app across calls
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+))
+
+_FX_CACHE_FILE = os.path.expanduser("~/.cache/finance_ai_fx.json")
+
+
+def _load_fx_cache() -> dict:
+    """Load today's cached rates from disk; stale (previous-day) caches are ignored."""
+    try:
+        with open(_FX_CACHE_FILE) as f:
+            saved = json.load(f)
+        if saved.get("date") == str(date.today()):
+            return saved.get("rates", {})
+    except Exception:
+        pass
+    return {}
+
+
+def _save_fx_cache() -> None:
+    try:
+        os.makedirs(os.path.dirname(_FX_CACHE_FILE), exist_ok=True)
+        with open(_FX_CACHE_FILE, "w") as f:
+            json.dump({"date": str(date.today()), "rates": _fx_cache}, f)
+    except Exception:
+        pass
+
+
+_fx_cache: dict = _load_fx_cache()
 
 def get_exchange_rate(from_currency: str, to_currency: str = "SEK") -> float:
     if from_currency == to_currency:
@@ -218,40 +606,109 @@ def get_exchange_rate(from_currency: str, to_currency: str = "SEK") -> float:
     if key in _fx_cache:
         return _fx_cache[key]
     try:
-        r = requests.get(f"https://api.frankfurter.app/latest?from={from_currency}&to={to_currency}", timeout=5)
+        r = _http.get(f"https://api.frankfurter.app/latest?from={from_currency}&to={to_currency}", timeout=5)
         rate = r.json()["rates"][to_currency]
         _fx_cache[key] = rate
+        _save_fx_cache()
         return rate
     except Exception:
         fallback = {"USD": 10.5, "EUR": 11.2, "GBP": 13.1, "NOK": 0.95, "DKK": 1.5}
         return fallback.get(from_currency, 1.0)
 
 
+# Throttle warm-up attempts: the Upload page calls prefetch_rates on every
+# rerun, and each attempt blocks on HTTP (with retry backoff) when the API
+# is down — one try per window is plenty for a once-a-day rate feed
+_FX_PREFETCH_COOLDOWN = 600  # seconds
+_fx_prefetch_next_try = 0.0
+
+
+def prefetch_rates(currencies: list, base: str = "SEK") -> None:
+    """Warm the FX cache for several currencies with ONE Frankfurter call.
+
+    Frankfurter returns base→currency rates, so they are inverted to the
+    currency→base direction that get_exchange_rate serves. At most one
+    attempt per cooldown window — a widget interaction must never re-block
+    on an unreachable rate API (get_exchange_rate still fetches on demand).
+    """
+    global _fx_prefetch_next_try
+    wanted = [c for c in currencies if c != base and f"{c}_{base}" not in _fx_cache]
+    if not wanted or time.monotonic() < _fx_prefetch_next_try:
+        return
+    _fx_prefetch_next_try = time.monotonic() + _FX_PREFETCH_COOLDOWN
+    try:
+        r = _http.get(f"https://api.frankfurter.app/latest?from={base}&to={','.join(wanted)}", timeout=5)
+        for cur, rate in r.json()["rates"].items():
+            if rate:
+                _fx_cache[f"{cur}_{base}"] = round(1 / rate, 6)
+        _save_fx_cache()
+    except Exception:
+        pass
+
+
 def convert_transactions_to_sek(transactions: list, source_currency: str) -> list:
-    if source_currency == "SEK":
+    if source_currency == "SEK" or not transactions:
         return transactions
     rate = get_exchange_rate(source_currency, "SEK")
-    result = []
-    for tx in transactions:
-        tx = tx.copy()
-        tx["original_amount"]   = tx.get("amount", 0)
-        tx["original_currency"] = source_currency
-        tx["amount"] = round(float(tx["amount"]) * rate, 2)
-        result.append(tx)
-    return result
+    _lazy_pandas()
+    df = pd.DataFrame(transactions)
+    df["original_amount"]   = df["amount"]
+    df["original_currency"] = source_currency
+    df["amount"] = (df["amount"].astype("float64") * rate).round(2)
+    # DataFrame-ing uneven dicts fills absent keys with NaN, which would defeat
+    # downstream .get(key, default) — strip them back out of each record
+    records = df.to_dict("records")
+    return [{k: v for k, v in rec.items() if not (isinstance(v, float) and v != v)} for rec in records]
 
 
 # ─────────────────────────────────────────────
 # ✨ AI Chat
 # ─────────────────────────────────────────────
-def chat_with_finances(user_message: str, financial_context: str, history: list) -> str:
-    system = f"""You are a smart personal finance advisor.
+# One ChatSession per financial-context hash — a Streamlit process serves
+# many user sessions concurrently, so a single module global would thrash
+# (rebuilding on every alternating turn) and cross conversations
+_CHAT_SESSIONS_MAX = 8
+_chat_sessions: OrderedDict = OrderedDict()
+
+
+def _get_chat_session(system: str, history: list):
+    """Reuse a Gemini ChatSession so the system prompt + history aren't resent each turn.
+
+    Sessions are keyed by the context hash; a fresh session (first turn, or
+    the context changed after a data upload) is seeded from the caller's
+    recent history so prior turns aren't dropped.
+    """
+    ctx_hash = hashlib.blake2b(system.encode(), digest_size=16).hexdigest()
+    session = _chat_sessions.get(ctx_hash)
+    if session is not None:
+        _chat_sessions.move_to_end(ctx_hash)
+        return session
+    seed = [
+        {"role": "user", "parts": [system]},
+        {"role": "model", "parts": ["Understood — I have your financial data and I'm ready to help."]},
+    ]
+    for role, msg in history[-6:]:
+        seed.append({"role": "user" if role == "user" else "model", "parts": [msg]})
+    session = _get_gemini().start_chat(history=seed)
+    _chat_sessions[ctx_hash] = session
+    if len(_chat_sessions) > _CHAT_SESSIONS_MAX:
+        _chat_sessions.popitem(last=False)
+    return session
+
+
+def _chat_system_prompt(financial_context: str) -> str:
+    return f"""You are a smart personal finance advisor.
 You have access to the user's real financial data. Answer clearly and helpfully with specific numbers.
 If the user writes in Arabic, respond in Arabic. If English, respond in English.
 
 FINANCIAL DATA:
 {financial_context}"""
 
+
+def stream_chat_with_finances(user_message: str, financial_context: str, history: list):
+    """Yield response chunks as they arrive — st.write_stream renders them live."""
+    system = _chat_system_prompt(financial_context)
+
     if GROQ_API_KEY:
         messages = [{"role": "system", "content": system}]
         for role, msg in history[-6:]:
@@ -260,19 +717,38 @@ FINANCIAL DATA:
         resp = requests.post(
             GROQ_URL,
             headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
-            json={"model": GROQ_MODEL, "messages": messages, "temperature": 0.7},
+            json={"model": GROQ_MODEL, "messages": messages, "temperature": 0.7, "stream": True},
             timeout=30,
+            stream=True,
         )
         resp.raise_for_status()
-        return resp.json()["choices"][0]["message"]["content"]
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            line = line.decode("utf-8")
+            if not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data == "[DONE]":
+                break
+            try:
+                delta = json.loads(data)["choices"][0]["delta"].get("content")
+            except Exception:
+                continue
+            if delta:
+                yield delta
+        return
 
-    # Fallback to Gemini
-    model = _get_gemini()
-    parts = [system]
-    for role, msg in history[-6:]:
-        parts.append(f"{'User' if role == 'user' else 'Assistant'}: {msg}")
-    parts.append(f"User: {user_message}")
-    return model.generate_content("\n\n".join(parts)).text
+    # Fallback to Gemini — the chat session carries the context and prior turns,
+    # rebuilt (and re-seeded from history) when the financial data changes
+    session = _get_chat_session(system, history)
+    for chunk in session.send_message(user_message, stream=True):
+        if chunk.text:
+            yield chunk.text
+
+
+def chat_with_finances(user_message: str, financial_context: str, history: list) -> str:
+    return "".join(stream_chat_with_finances(user_message, financial_context, history))
 
 
 # ─────────────────────────────────────────────
@@ -284,6 +760,12 @@ CATEGORY_ICONS = {
     "Housing": "🏠", "Salary": "💼", "Other": "📦",
 }
 
+VALID_CATEGORIES = frozenset(CATEGORY_ICONS)
+
+# Interned once — every parsed transaction shares these two label objects
+_EXPENSE = sys.intern("expense")
+_INCOME  = sys.intern("income")
+
 CATEGORY_COLORS = {
     "Food": "#f472b6", "Transport": "#60a5fa", "Shopping": "#fb923c",
     "Health": "#34d399", "Education": "#a78bfa", "Entertainment": "#fbbf24",
@@ -3,10 +3,12 @@
 ✨ v2.0: PDF OCR · Multi-Currency · AI Chat · PDF Reports · Budget Alerts
 """
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 from PIL import Image
 from datetime import date
+from io import BytesIO
 from sqlalchemy import text
 import sys, os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -14,8 +16,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from database import get_engine, init_db
 from ai_parser import (
     parse_document, parse_text_document, parse_pdf_file,
-    parse_csv_file, chat_with_finances,
-    convert_transactions_to_sek, get_exchange_rate,
+    parse_csv_file, chat_with_finances, stream_chat_with_finances,
+    convert_transactions_to_sek, get_exchange_rate, prefetch_rates,
     CATEGORY_ICONS, CATEGORY_COLORS
 )
 from pdf_report import generate_pdf_report
@@ -124,66 +126,218 @@ for key, default in [
         st.session_state[key] = default
 
 # ── DB Helpers ─────────────────────────────────────────────────
+# Reads are cached; writes bump data_version so the next read misses the cache
+def _data_version() -> int:
+    return st.session_state.get("data_version", 0)
+
+def _bump_data_version():
+    st.session_state["data_version"] = _data_version() + 1
+
 def save_document(engine, filename, doc_type, summary):
     sql = text("INSERT INTO documents (filename, doc_type, summary) VALUES (:f,:t,:s) RETURNING id")
-    with engine.connect() as conn:
-        result = conn.execute(sql, {"f": filename, "t": doc_type, "s": summary})
-        conn.commit()
-        return result.fetchone()[0]
+    with engine.begin() as conn:
+        return conn.execute(sql, {"f": filename, "t": doc_type, "s": summary}).fetchone()[0]
 
 def save_transactions(engine, doc_id, transactions, currency="SEK"):
     sql = text("""INSERT INTO transactions
         (document_id, transaction_date, description, amount, currency, category, transaction_type)
         VALUES (:doc_id,:date,:desc,:amount,:currency,:category,:type)""")
-    with engine.connect() as conn:
-        for tx in transactions:
-            try:
-                conn.execute(sql, {
-                    "doc_id": doc_id,
-                    "date": tx.get("date", str(date.today())),
-                    "desc": tx.get("description", ""),
-                    "amount": float(tx.get("amount", 0)),
-                    "currency": tx.get("original_currency", currency),
-                    "category": tx.get("category", "Other"),
-                    "type": tx.get("type", "expense"),
-                })
-            except Exception:
-                continue
-        conn.commit()
+    rows = []
+    for tx in transactions:
+        try:
+            rows.append({
+                "doc_id": doc_id,
+                "date": tx.get("date", str(date.today())),
+                "desc": tx.get("description", ""),
+                "amount": float(tx.get("amount", 0)),
+                "currency": tx.get("original_currency", currency),
+                "category": tx.get("category", "Other"),
+                "type": tx.get("type", "expense"),
+            })
+        except Exception:
+            continue
+    if rows:
+        # One executemany round-trip instead of one INSERT per transaction
+        with engine.begin() as conn:
+            conn.execute(sql, rows)
+    _bump_data_version()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_transactions(version: int) -> pd.DataFrame:
+    # read_sql_query skips the table-reflection path, parses dates once, and
+    # builds the low-cardinality columns directly as categoricals (groupbys
+    # hash int codes, masks compare codes, no str object per row)
+    df = pd.read_sql_query(
+        text("SELECT id, document_id, transaction_date, description, amount, currency, "
+             "category, transaction_type FROM transactions ORDER BY transaction_date DESC"),
+        engine,
+        parse_dates=["transaction_date"],
+        dtype={"category": "category", "transaction_type": "category", "currency": "category"},
+    )
+    # Icon resolved once per cache fill (one map over category codes) —
+    # pages read the column instead of doing per-row dict lookups. Map via
+    # object dtype: mapping the categorical directly yields a Categorical
+    # whose categories may not include the 📦 fallback, making fillna raise.
+    df["icon"] = df["category"].astype(str).map(CATEGORY_ICONS).fillna("📦").astype("category")
+    return df
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_budgets(version: int) -> pd.DataFrame:
+    return pd.read_sql("SELECT * FROM budgets", engine)
 
 def get_all_transactions(engine):
     try:
-        return pd.read_sql("SELECT * FROM transactions ORDER BY transaction_date DESC", engine)
+        return _load_transactions(_data_version())
     except Exception:
         return pd.DataFrame()
 
 def get_budgets(engine):
     try:
-        return pd.read_sql("SELECT * FROM budgets", engine)
+        return _load_budgets(_data_version())
     except Exception:
         return pd.DataFrame()
 
+# ── SQL aggregates — a few numbers over the wire instead of every row ──
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_category_expense_sums(version: int) -> pd.DataFrame:
+    return pd.read_sql(
+        "SELECT category, SUM(amount) AS amount FROM transactions "
+        "WHERE transaction_type = 'expense' GROUP BY category", engine)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_dow_expenses(version: int) -> pd.DataFrame:
+    return pd.read_sql(
+        "SELECT EXTRACT(DOW FROM transaction_date)::int AS day_num, SUM(amount) AS amount "
+        "FROM transactions WHERE transaction_type = 'expense' "
+        "GROUP BY day_num ORDER BY day_num", engine)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_monthly_totals(version: int) -> pd.DataFrame:
+    return pd.read_sql(
+        "SELECT to_char(month, 'YYYY-MM') AS month, transaction_type, total "
+        "FROM monthly_summary", engine)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_month_category_totals(version: int) -> pd.Series:
+    df = pd.read_sql(
+        "SELECT category, SUM(amount) AS amount FROM transactions "
+        "WHERE transaction_type = 'expense' "
+        "AND transaction_date >= date_trunc('month', CURRENT_DATE) "
+        "AND transaction_date < date_trunc('month', CURRENT_DATE) + interval '1 month' "
+        "GROUP BY category", engine)
+    return df.set_index("category")["amount"]
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_sidebar_totals(version: int):
+    with engine.connect() as conn:
+        row = conn.execute(text(
+            "SELECT COALESCE(SUM(amount) FILTER (WHERE transaction_type = 'income'), 0) AS inc, "
+            "COALESCE(SUM(amount) FILTER (WHERE transaction_type = 'expense'), 0) AS exp "
+            "FROM transactions")).one()
+    return float(row.inc), float(row.exp)
+
+def get_sidebar_totals(engine):
+    """Total income and expenses — two scalars over the wire, not every row."""
+    try:
+        return _load_sidebar_totals(_data_version())
+    except Exception:
+        return 0.0, 0.0
+
+# Fallbacks keep the expected columns so downstream groupby/sort degrade
+# to empty charts instead of KeyErrors
+def get_category_expense_sums(engine):
+    try:
+        return _load_category_expense_sums(_data_version())
+    except Exception:
+        return pd.DataFrame(columns=["category", "amount"])
+
+def get_dow_expenses(engine):
+    try:
+        return _load_dow_expenses(_data_version())
+    except Exception:
+        return pd.DataFrame(columns=["day_num", "amount"])
+
+def get_monthly_totals(engine):
+    try:
+        return _load_monthly_totals(_data_version())
+    except Exception:
+        return pd.DataFrame(columns=["month", "transaction_type", "total"])
+
+def get_month_category_totals(engine):
+    """This month's expense sum per category (Series indexed by category)."""
+    try:
+        return _load_month_category_totals(_data_version())
+    except Exception:
+        return pd.Series(dtype=float)
+
+# ── Transaction row rendering ──────────────────────────────────
+# Parsed once at module load; each row is a single format call against it
+_TX_TPL = (
+    '<div class="tx-row">'
+    '<div style="display:flex;gap:12px;align-items:center">'
+    '<span style="font-size:1.3rem">{icon}</span>'
+    '<div><div style="font-weight:600">{desc}</div>'
+    '<div style="font-size:0.78rem;color:rgba(255,255,255,0.4)">{cat} · {date}</div></div>'
+    '</div>'
+    '<div style="font-weight:800;color:{color};font-size:1.1rem">{sign}{amount:,.0f} SEK</div>'
+    '</div>'
+).format
+
+
+def render_tx_rows(df, desc_len=55):
+    """Render transaction rows as ONE markdown call.
+
+    Columns are pulled out vectorized, each row fills the precompiled
+    template, and the joined HTML goes through a single st.markdown
+    instead of an iterrows loop with a component round-trip per row.
+    """
+    if df.empty:
+        return
+    is_inc  = df["transaction_type"].to_numpy() == "income"
+    icons   = (df["icon"] if "icon" in df.columns
+               else df["category"].astype(str).map(CATEGORY_ICONS).fillna("📦")).to_numpy()
+    cats    = df["category"].astype(str).to_numpy()
+    colors  = np.where(is_inc, "#34d399", "#f87171")
+    signs   = np.where(is_inc, "+", "-")
+    descs   = df["description"].astype(str).fillna("").str.slice(0, desc_len).to_numpy()
+    dates   = df["transaction_date"].astype(str).fillna("").str.slice(0, 10).to_numpy()
+    amounts = df["amount"].to_numpy(dtype=float)
+    parts = [
+        _TX_TPL(icon=icon, desc=desc, cat=cat, date=dt, color=color, sign=sign, amount=amount)
+        for icon, desc, cat, dt, color, sign, amount
+        in zip(icons, descs, cats, dates, colors, signs, amounts)
+    ]
+    st.markdown("".join(parts), unsafe_allow_html=True)
+
 # ── Insights + Budget Alerts ───────────────────────────────────
 def generate_insights(df, engine=None):
     insights, warnings = [], []
     if df.empty:
         return insights, warnings
 
-    expenses = df[df["transaction_type"] == "expense"]
-    income   = df[df["transaction_type"] == "income"]
+    types = df["transaction_type"].to_numpy()
+    expenses = df.loc[types == "expense"]
+    income   = df.loc[types == "income"]
 
     if not expenses.empty:
-        top_cat = expenses.groupby("category")["amount"].sum().idxmax()
-        top_pct = expenses.groupby("category")["amount"].sum().max() / expenses["amount"].sum() * 100
+        # Pure-NumPy stats: factorize once, then bincount does the whole
+        # category aggregation in a single C pass — no pandas dispatch
+        amounts = expenses["amount"].to_numpy(dtype=np.float64)
+        codes, cats = pd.factorize(expenses["category"].to_numpy())
+        cat_sums  = np.bincount(codes, weights=amounts)
+        exp_total = amounts.sum()
+        top_i = cat_sums.argmax()
+        top_cat = cats[top_i]
+        top_pct = cat_sums[top_i] / exp_total * 100
         icon = CATEGORY_ICONS.get(top_cat, "📦")
         insights.append(f"{icon} Top category: **{top_cat}** — **{top_pct:.0f}%** of spending")
-        insights.append(f"📊 Average transaction: **{expenses['amount'].mean():,.0f} SEK**")
-        big = expenses[expenses["amount"] > expenses["amount"].quantile(0.9)]
-        if not big.empty:
-            warnings.append(f"⚠️ **{len(big)} unusually large transactions** — review them!")
+        insights.append(f"📊 Average transaction: **{exp_total / amounts.size:,.0f} SEK**")
+        n_big = int((amounts > np.quantile(amounts, 0.9)).sum())
+        if n_big:
+            warnings.append(f"⚠️ **{n_big} unusually large transactions** — review them!")
 
     if not income.empty and not expenses.empty:
-        ratio = expenses["amount"].sum() / income["amount"].sum() * 100
+        ratio = exp_total / income["amount"].sum() * 100
         if ratio > 80:
             warnings.append(f"🔴 Expenses are **{ratio:.0f}%** of income — budget is tight!")
         else:
@@ -193,10 +347,7 @@ def generate_insights(df, engine=None):
     if engine:
         budget_df = get_budgets(engine)
         if not budget_df.empty and not expenses.empty:
-            df_c = df.copy()
-            df_c["transaction_date"] = pd.to_datetime(df_c["transaction_date"], errors="coerce")
-            this_month = df_c[df_c["transaction_date"].dt.month == date.today().month]
-            exp_month  = this_month[this_month["transaction_type"] == "expense"].groupby("category")["amount"].sum()
+            exp_month = get_month_category_totals(engine)
             for _, b in budget_df.iterrows():
                 cat   = b["category"]
                 limit = float(b["monthly_limit"])
@@ -220,9 +371,7 @@ with st.sidebar:
         "📊 Analytics", "🎯 Budget", "💬 AI Chat", "⚙️ Manage Data"
     ], label_visibility="collapsed")
     st.markdown("---")
-    df_all = get_all_transactions(engine) if engine else pd.DataFrame()
-    total_in  = df_all[df_all["transaction_type"] == "income"]["amount"].sum()  if not df_all.empty else 0
-    total_out = df_all[df_all["transaction_type"] == "expense"]["amount"].sum() if not df_all.empty else 0
+    total_in, total_out = get_sidebar_totals(engine) if engine else (0.0, 0.0)
     net = total_in - total_out
     net_color = "#34d399" if net >= 0 else "#f87171"
     st.markdown(f"""
@@ -252,9 +401,10 @@ if page == "🏠 Dashboard":
         col1, col2 = st.columns(2)
         with col1:
             st.markdown('<div class="section-title">💰 Expense Distribution</div>', unsafe_allow_html=True)
-            exp = df_all[df_all["transaction_type"] == "expense"]
-            if not exp.empty:
-                cat_sum = exp.groupby("category")["amount"].sum().reset_index()
+            cat_sum = get_category_expense_sums(engine)
+            if not cat_sum.empty:
+                # float32 halves the serialized payload Plotly ships to the browser
+                cat_sum["amount"] = cat_sum["amount"].astype("float32")
                 cat_sum["label"] = cat_sum["category"].map(CATEGORY_ICONS).fillna("📦") + " " + cat_sum["category"]
                 fig = px.pie(cat_sum, values="amount", names="label",
                              color_discrete_sequence=[CATEGORY_COLORS.get(c, "#6b7280") for c in cat_sum["category"]], hole=0.45)
@@ -264,9 +414,13 @@ if page == "🏠 Dashboard":
 
         with col2:
             st.markdown('<div class="section-title">📈 Monthly Income vs Expenses</div>', unsafe_allow_html=True)
-            df_all["transaction_date"] = pd.to_datetime(df_all["transaction_date"], errors="coerce")
-            monthly = df_all.groupby([df_all["transaction_date"].dt.to_period("M").astype(str), "transaction_type"])["amount"].sum().reset_index()
+            # date_trunc already happened in the monthly_summary view — only a
+            # few pre-aggregated rows to fold per month/type here
+            monthly = (get_monthly_totals(engine)
+                       .groupby(["month","transaction_type"], sort=False, observed=True)["total"]
+                       .sum().reset_index().sort_values("month"))
             monthly.columns = ["month","type","amount"]
+            monthly["amount"] = monthly["amount"].astype("float32")
             fig2 = px.bar(monthly, x="month", y="amount", color="type", barmode="group",
                           color_discrete_map={"income":"#34d399","expense":"#f87171"})
             fig2.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="#e2e8f0", xaxis_title="", yaxis_title="SEK")
@@ -299,18 +453,7 @@ if page == "🏠 Dashboard":
                         st.error(f"Report error: {e}")
 
         st.markdown('<div class="section-title">🕐 Recent Transactions</div>', unsafe_allow_html=True)
-        for _, row in df_all.head(8).iterrows():
-            icon  = CATEGORY_ICONS.get(row["category"], "📦")
-            color = "#34d399" if row["transaction_type"] == "income" else "#f87171"
-            sign  = "+" if row["transaction_type"] == "income" else "-"
-            st.markdown(f"""<div class="tx-row">
-                <div style="display:flex;gap:12px;align-items:center">
-                    <span style="font-size:1.3rem">{icon}</span>
-                    <div><div style="font-weight:600">{str(row['description'])[:50]}</div>
-                    <div style="font-size:0.78rem;color:rgba(255,255,255,0.4)">{row['category']} · {row['transaction_date']}</div></div>
-                </div>
-                <div style="font-weight:800;color:{color};font-size:1.05rem">{sign}{row['amount']:,.0f} SEK</div>
-            </div>""", unsafe_allow_html=True)
+        render_tx_rows(df_all.head(8), desc_len=50)
 
 # ══════════════════════════════════════════════════════════════
 # 📄 UPLOAD
@@ -327,28 +470,39 @@ elif page == "📄 Upload Document":
         st.session_state.save_success      = False
 
     if uploaded:
+        # Preview + analysis share these bytes; the decoded image is kept
+        # across reruns and dropped when the payload changes (also covers
+        # re-uploading a modified file under the same name)
+        file_bytes = uploaded.getvalue()
+        if file_bytes != st.session_state.get("upload_bytes"):
+            st.session_state.upload_bytes = file_bytes
+            st.session_state.upload_image = None
         col1, col2 = st.columns(2)
         with col1:
             st.markdown('<div class="section-title">📎 Preview</div>', unsafe_allow_html=True)
             if uploaded.type == "text/csv":
                 st.success(f"📊 CSV: {uploaded.name}")
                 try:
-                    df_prev = pd.read_csv(uploaded); uploaded.seek(0)
+                    df_prev = pd.read_csv(BytesIO(file_bytes))
                     st.dataframe(df_prev.head(5), use_container_width=True)
                 except Exception:
                     pass
             elif uploaded.type == "application/pdf":
                 st.info(f"📄 PDF: {uploaded.name}\n\n✨ OCR will extract text automatically")
             else:
-                st.image(Image.open(uploaded), use_column_width=True, caption=uploaded.name)
+                if st.session_state.get("upload_image") is None:
+                    st.session_state.upload_image = Image.open(BytesIO(file_bytes))
+                st.image(st.session_state.upload_image, use_container_width=True, caption=uploaded.name)
 
         with col2:
             st.markdown('<div class="section-title">🤖 AI Analysis</div>', unsafe_allow_html=True)
 
-            # Currency selector
+            # Currency selector — one batched FX call warms all rates up front
+            currencies = ["SEK","USD","EUR","GBP","NOK","DKK","JPY","CHF"]
+            prefetch_rates(currencies)
             c1, c2 = st.columns(2)
             with c1:
-                source_currency = st.selectbox("Currency", ["SEK","USD","EUR","GBP","NOK","DKK","JPY","CHF"])
+                source_currency = st.selectbox("Currency", currencies)
             with c2:
                 if source_currency != "SEK":
                     try:
@@ -361,13 +515,14 @@ elif page == "📄 Upload Document":
                 st.session_state.save_success = False
                 with st.spinner("🧠 Gemini AI is reading..."):
                     try:
-                        uploaded.seek(0)
                         if uploaded.type == "text/csv":
-                            parsed = parse_csv_file(uploaded.read().decode("utf-8"))
+                            parsed = parse_csv_file(file_bytes.decode("utf-8"))
                         elif uploaded.type == "application/pdf":
-                            parsed = parse_pdf_file(uploaded.read())   # ✨ Real OCR
+                            parsed = parse_pdf_file(file_bytes)   # ✨ Real OCR
                         else:
-                            parsed = parse_document(Image.open(uploaded))
+                            if st.session_state.get("upload_image") is None:
+                                st.session_state.upload_image = Image.open(BytesIO(file_bytes))
+                            parsed = parse_document(st.session_state.upload_image)
 
                         # ✨ Auto convert currency
                         doc_currency = parsed.get("currency", source_currency)
@@ -427,7 +582,6 @@ elif page == "💳 Transactions":
     if df.empty:
         st.info("Upload documents first!")
     else:
-        df["transaction_date"] = pd.to_datetime(df["transaction_date"], errors="coerce")
         c1, c2, c3 = st.columns(3)
         with c1: tx_type = st.selectbox("Type", ["All","expense","income"])
         with c2: cat_filter = st.selectbox("Category", ["All"] + sorted(df["category"].unique().tolist()))
@@ -444,21 +598,9 @@ elif page == "💳 Transactions":
                                  (filtered["transaction_date"].dt.date <= date_range[1])]
 
         st.markdown(f"*{len(filtered)} transactions · Total: **{filtered['amount'].sum():,.0f} SEK***")
-        for _, row in filtered.iterrows():
-            icon  = CATEGORY_ICONS.get(row["category"], "📦")
-            color = "#34d399" if row["transaction_type"] == "income" else "#f87171"
-            sign  = "+" if row["transaction_type"] == "income" else "-"
-            tx_date = row["transaction_date"].strftime("%Y-%m-%d") if hasattr(row["transaction_date"], "strftime") else str(row["transaction_date"])[:10]
-            st.markdown(f"""<div class="tx-row">
-                <div style="display:flex;gap:12px;align-items:center">
-                    <span style="font-size:1.3rem">{icon}</span>
-                    <div><div style="font-weight:600">{str(row['description'])[:55]}</div>
-                    <div style="font-size:0.78rem;color:rgba(255,255,255,0.4)">{row['category']} · {tx_date}</div></div>
-                </div>
-                <div style="font-weight:800;color:{color};font-size:1.1rem">{sign}{row['amount']:,.0f} SEK</div>
-            </div>""", unsafe_allow_html=True)
+        render_tx_rows(filtered)
         st.markdown("---")
-        st.download_button("⬇️ Export CSV", filtered.to_csv(index=False).encode("utf-8-sig"), "transactions.csv", "text/csv")
+        st.download_button("⬇️ Export CSV", filtered.drop(columns=["icon"]).to_csv(index=False).encode("utf-8-sig"), "transactions.csv", "text/csv")
 
 # ══════════════════════════════════════════════════════════════
 # 📊 ANALYTICS
@@ -469,40 +611,47 @@ elif page == "📊 Analytics":
     if df.empty:
         st.info("Upload documents first!")
     else:
-        df["transaction_date"] = pd.to_datetime(df["transaction_date"], errors="coerce")
-        expenses = df[df["transaction_type"] == "expense"]
+        expenses = df.loc[df["transaction_type"].to_numpy() == "expense"]
         if not expenses.empty:
             c1, c2 = st.columns(2)
             with c1:
                 st.markdown('<div class="section-title">📅 Weekly Spending</div>', unsafe_allow_html=True)
-                w = expenses.copy()
-                w["week"] = w["transaction_date"].dt.to_period("W").astype(str)
-                w_sum = w.groupby("week")["amount"].sum().reset_index()
-                fig = px.line(w_sum, x="week", y="amount", markers=True, color_discrete_sequence=["#818cf8"])
+                week = expenses["transaction_date"].dt.to_period("W").astype(str)
+                w_sum = expenses.groupby(week, sort=False, observed=True)["amount"].sum().reset_index().sort_values("transaction_date")
+                w_sum.columns = ["week", "amount"]
+                w_sum["amount"] = w_sum["amount"].astype("float32")
+                # SVG re-layout chokes past ~1k points; hand big series to the GPU
+                fig = px.line(w_sum, x="week", y="amount", markers=True, color_discrete_sequence=["#818cf8"],
+                              render_mode="webgl" if len(w_sum) > 1000 else "svg")
                 fig.update_traces(fill="tozeroy", fillcolor="rgba(99,102,241,0.1)")
                 fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="#e2e8f0", xaxis_title="", yaxis_title="SEK")
                 st.plotly_chart(fig, use_container_width=True)
             with c2:
                 st.markdown('<div class="section-title">🏆 Top Categories</div>', unsafe_allow_html=True)
-                cat_sum = expenses.groupby("category")["amount"].sum().sort_values().reset_index()
+                cat_sum = get_category_expense_sums(engine).sort_values("amount")
+                cat_sum["amount"] = cat_sum["amount"].astype("float32")
                 cat_sum["label"] = cat_sum["category"].map(CATEGORY_ICONS).fillna("📦") + " " + cat_sum["category"]
                 fig2 = px.bar(cat_sum, x="amount", y="label", orientation="h", color="category", color_discrete_map=CATEGORY_COLORS)
                 fig2.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="#e2e8f0", showlegend=False, xaxis_title="SEK", yaxis_title="")
                 st.plotly_chart(fig2, use_container_width=True)
 
             st.markdown('<div class="section-title">📆 By Day of Week</div>', unsafe_allow_html=True)
-            days = {0:"Monday",1:"Tuesday",2:"Wednesday",3:"Thursday",4:"Friday",5:"Saturday",6:"Sunday"}
-            ex2 = expenses.copy()
-            ex2["day_num"]  = ex2["transaction_date"].dt.dayofweek
-            ex2["day_name"] = ex2["day_num"].map(days)
-            day_sum = ex2.groupby(["day_num","day_name"])["amount"].sum().reset_index().sort_values("day_num")
+            # Postgres DOW: 0=Sunday … 6=Saturday; chart stays Monday-first
+            days = {0:"Sunday",1:"Monday",2:"Tuesday",3:"Wednesday",4:"Thursday",5:"Friday",6:"Saturday"}
+            day_sum = get_dow_expenses(engine)
+            day_sum["day_name"] = day_sum["day_num"].map(days)
+            day_sum = day_sum.sort_values(by="day_num", key=lambda d: (d + 6) % 7)
+            day_sum["amount"] = day_sum["amount"].astype("float32")
             fig3 = px.bar(day_sum, x="day_name", y="amount", color="amount", color_continuous_scale=["#4f46e5","#f87171"])
             fig3.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="#e2e8f0", coloraxis_showscale=False, xaxis_title="", yaxis_title="SEK")
             st.plotly_chart(fig3, use_container_width=True)
 
             st.markdown('<div class="section-title">📋 Monthly Summary</div>', unsafe_allow_html=True)
-            df["month"] = df["transaction_date"].dt.to_period("M").astype(str)
-            mp = df.groupby(["month","transaction_type"])["amount"].sum().unstack(fill_value=0).reset_index()
+            monthly_totals = get_monthly_totals(engine)
+            # Explicit sort — unstack keeps appearance order, which would
+            # otherwise couple this table to the view's ORDER BY month DESC
+            mp = (monthly_totals.groupby(["month","transaction_type"], sort=False, observed=True)["total"].sum()
+                  .unstack(fill_value=0).reset_index().sort_values("month")) if not monthly_totals.empty else pd.DataFrame()
             if "income" in mp.columns and "expense" in mp.columns:
                 mp["net"] = mp["income"] - mp["expense"]
                 mp.columns.name = None
@@ -524,20 +673,18 @@ elif page == "🎯 Budget":
 
     if st.button("💾 Save Budget"):
         sql = text("INSERT INTO budgets (category, monthly_limit) VALUES (:cat,:limit) ON CONFLICT (category) DO UPDATE SET monthly_limit = EXCLUDED.monthly_limit")
-        with engine.connect() as conn:
-            for cat, limit in budgets.items():
-                if limit > 0:
-                    conn.execute(sql, {"cat": cat, "limit": limit})
-            conn.commit()
+        rows = [{"cat": cat, "limit": limit} for cat, limit in budgets.items() if limit > 0]
+        if rows:
+            with engine.begin() as conn:
+                conn.execute(sql, rows)
+        _bump_data_version()
         st.success("✅ Saved!")
 
     df = get_all_transactions(engine) if engine else pd.DataFrame()
     budget_df = get_budgets(engine)
     if not df.empty and not budget_df.empty:
         st.markdown('<div class="section-title">📊 This Month</div>', unsafe_allow_html=True)
-        df["transaction_date"] = pd.to_datetime(df["transaction_date"], errors="coerce")
-        this_month = df[df["transaction_date"].dt.month == date.today().month]
-        exp_month  = this_month[this_month["transaction_type"] == "expense"].groupby("category")["amount"].sum()
+        exp_month = get_month_category_totals(engine)
         for _, brow in budget_df.iterrows():
             cat   = brow["category"]
             limit = float(brow["monthly_limit"])
@@ -565,10 +712,10 @@ elif page == "💬 AI Chat":
     if df.empty:
         st.markdown('<div class="warning-card">⚠️ No data yet. Upload documents first!</div>', unsafe_allow_html=True)
     else:
-        df["transaction_date"] = pd.to_datetime(df["transaction_date"], errors="coerce")
-        expenses = df[df["transaction_type"] == "expense"]
-        income   = df[df["transaction_type"] == "income"]
-        cat_breakdown = expenses.groupby("category")["amount"].sum().to_dict() if not expenses.empty else {}
+        types = df["transaction_type"].to_numpy()
+        expenses = df.loc[types == "expense"]
+        income   = df.loc[types == "income"]
+        cat_breakdown = expenses.groupby("category", sort=False, observed=True)["amount"].sum().to_dict() if not expenses.empty else {}
 
         financial_context = f"""
 Total income: {income['amount'].sum():,.0f} SEK
@@ -598,8 +745,7 @@ Recent 10 transactions:
             with cols[i % 3]:
                 if st.button(ex, key=f"q{i}"):
                     st.session_state.chat_history.append(("user", ex))
-                    with st.spinner("Thinking..."):
-                        resp = chat_with_finances(ex, financial_context, st.session_state.chat_history[:-1])
+                    resp = st.write_stream(stream_chat_with_finances(ex, financial_context, st.session_state.chat_history[:-1]))
                     st.session_state.chat_history.append(("ai", resp))
                     st.rerun()
 
@@ -616,12 +762,13 @@ Recent 10 transactions:
         user_input = st.chat_input("Ask about your finances...")
         if user_input:
             st.session_state.chat_history.append(("user", user_input))
-            with st.spinner("🧠 Analyzing..."):
-                try:
-                    resp = chat_with_finances(user_input, financial_context, st.session_state.chat_history[:-1])
-                    st.session_state.chat_history.append(("ai", resp))
-                except Exception as e:
-                    st.session_state.chat_history.append(("ai", f"Error: {e}"))
+            st.markdown(f'<div class="chat-bubble-user">👤 {user_input}</div>', unsafe_allow_html=True)
+            try:
+                # ✨ Stream tokens as they arrive instead of blocking on the full answer
+                resp = st.write_stream(stream_chat_with_finances(user_input, financial_context, st.session_state.chat_history[:-1]))
+            except Exception as e:
+                resp = f"Error: {e}"
+            st.session_state.chat_history.append(("ai", resp))
             st.rerun()
 
         if st.session_state.chat_history:
@@ -647,9 +794,9 @@ elif page == "⚙️ Manage Data":
                 with st.expander(f"📄 {doc['filename']} — {tx_count} tx · {str(doc['upload_date'])[:10]}"):
                     st.write(f"**Type:** {doc['doc_type']}  |  **Summary:** {doc['summary']}")
                     if st.button("🗑️ Delete", key=f"del_{doc['id']}"):
-                        with engine.connect() as conn:
+                        with engine.begin() as conn:
                             conn.execute(text("DELETE FROM documents WHERE id = :id"), {"id": int(doc["id"])})
-                            conn.commit()
+                        _bump_data_version()
                         st.success("Deleted!")
                         st.rerun()
     except Exception as e:
@@ -64,9 +64,21 @@ def _build_database_url() -> str:
 
 
 def get_engine():
-    """Create and return a SQLAlchemy engine."""
+    """Create and return a SQLAlchemy engine.
+
+    Pool settings are sized for a single Streamlit worker: a handful of
+    warm TLS connections kept alive (and health-checked) across reruns
+    instead of a fresh handshake per page click.
+    """
     url = _build_database_url()
-    return create_engine(url, connect_args={"sslmode": "require"})
+    return create_engine(
+        url,
+        connect_args={"sslmode": "require"},
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
 
 
 SCHEMA_SQL = """
@@ -98,6 +110,13 @@ CREATE TABLE IF NOT EXISTS budgets (
     created_at  TIMESTAMP DEFAULT NOW()
 );
 
+-- Indexes matching the hot query patterns: date-ordered listing,
+-- type+date range aggregates, per-category sums, and cascade deletes
+CREATE INDEX IF NOT EXISTS ix_tx_date      ON transactions(transaction_date DESC);
+CREATE INDEX IF NOT EXISTS ix_tx_type_date ON transactions(transaction_type, transaction_date);
+CREATE INDEX IF NOT EXISTS ix_tx_cat       ON transactions(category);
+CREATE INDEX IF NOT EXISTS ix_tx_doc       ON transactions(document_id);
+
 CREATE OR REPLACE VIEW monthly_summary AS
 SELECT
     DATE_TRUNC('month', transaction_date) AS month,
@@ -111,12 +130,21 @@ ORDER BY 1 DESC, 4 DESC;
 """
 
 
+# Bump whenever SCHEMA_SQL changes so init_db re-runs the DDL exactly once
+SCHEMA_VERSION = 2
+
+
 def init_db():
-    """Initialize database with schema."""
+    """Initialize database with schema (a version check makes reruns zero-DDL)."""
     engine = get_engine()
-    with engine.connect() as conn:
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_meta (version INT PRIMARY KEY)"))
+        current = conn.execute(text("SELECT MAX(version) FROM schema_meta")).scalar()
+        if current == SCHEMA_VERSION:
+            return
         conn.execute(text(SCHEMA_SQL))
-        conn.commit()
+        conn.execute(text("DELETE FROM schema_meta"))
+        conn.execute(text("INSERT INTO schema_meta (version) VALUES (:v)"), {"v": SCHEMA_VERSION})
     print("✅ Database ready!")
 
 
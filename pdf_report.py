@@ -13,6 +13,8 @@ from reportlab.platypus import (
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from io import BytesIO
 from datetime import date
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 
 
@@ -40,7 +42,106 @@ CATEGORY_ICONS = {
     "Housing": "🏠", "Salary": "💼", "Other": "📦",
 }
 
-
+# Pre-converted once — HexColor parses its string argument on every call,
+# and the hexval() strings feed the <font color=...> markup in hot loops
+CATEGORY_COLOR     = {k: colors.HexColor(v) for k, v in CATEGORY_HEX.items()}
+_DEFAULT_CAT_COLOR = colors.HexColor("#6b7280")
+
+# Ready-made <font> open tags — hexval() formats a string on every call,
+# so the hot loops concatenate these constants instead
+FONT_CLOSE = "</font>"
+_FONT_OPEN = {
+    "green":  f'<font color="{GREEN.hexval()}">',
+    "red":    f'<font color="{RED.hexval()}">',
+    "border": f'<font color="{BORDER.hexval()}">',
+}
+_CAT_FONT_OPEN = {k: f'<font color="{c.hexval()}">' for k, c in CATEGORY_COLOR.items()}
+_DEFAULT_CAT_FONT_OPEN = f'<font color="{_DEFAULT_CAT_COLOR.hexval()}">'
+
+# All 21 possible progress bars (0–20 filled cells), built once
+_BAR_FULL  = ["█" * i for i in range(21)]
+_BAR_EMPTY = ["░" * (20 - i) for i in range(21)]
+
+ZEBRA = colors.HexColor("#162032")
+
+# TableStyles are static modulo row count (ROWBACKGROUNDS zebra-stripes
+# regardless of length) — build each once and share across reports
+_KPI_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, -1), BG_CARD),
+    ("ROWBACKGROUNDS", (0, 0), (-1, -1), [BG_CARD]),
+    ("BOX", (0, 0), (-1, -1), 0.5, BORDER),
+    ("INNERGRID", (0, 0), (-1, -1), 0.5, BORDER),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("TOPPADDING", (0, 0), (-1, -1), 14),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 14),
+    ("LEFTPADDING", (0, 0), (-1, -1), 10),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+    ("ROUNDEDCORNERS", [6, 6, 6, 6]),
+])
+
+_CAT_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), INDIGO_DARK),
+    ("BACKGROUND", (0, 1), (-1, -1), BG_CARD),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [BG_CARD, ZEBRA]),
+    ("TEXTCOLOR", (0, 0), (-1, 0), TEXT_MAIN),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 8),
+    ("BOX", (0, 0), (-1, -1), 0.5, BORDER),
+    ("INNERGRID", (0, 0), (-1, -1), 0.3, BORDER),
+    ("TOPPADDING", (0, 0), (-1, -1), 7),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 7),
+    ("LEFTPADDING", (0, 0), (-1, -1), 8),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("ALIGN", (1, 0), (2, -1), "CENTER"),
+])
+
+_TX_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), INDIGO_DARK),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [BG_CARD, ZEBRA]),
+    ("TEXTCOLOR", (0, 0), (-1, 0), TEXT_MAIN),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 8),
+    # Styling for the raw-string body cells (date muted, text columns plain)
+    ("FONTNAME", (0, 1), (2, -1), "Helvetica"),
+    ("TEXTCOLOR", (0, 1), (0, -1), TEXT_MUTED),
+    ("FONTSIZE", (0, 1), (0, -1), 8),
+    ("TEXTCOLOR", (1, 1), (2, -1), TEXT_MAIN),
+    ("FONTSIZE", (1, 1), (2, -1), 9),
+    ("BOX", (0, 0), (-1, -1), 0.5, BORDER),
+    ("INNERGRID", (0, 0), (-1, -1), 0.3, BORDER),
+    ("TOPPADDING", (0, 0), (-1, -1), 6),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+    ("LEFTPADDING", (0, 0), (-1, -1), 8),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+])
+
+_MONTH_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), INDIGO_DARK),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [BG_CARD, ZEBRA]),
+    ("TEXTCOLOR", (0, 0), (-1, 0), TEXT_MAIN),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 8),
+    ("BOX", (0, 0), (-1, -1), 0.5, BORDER),
+    ("INNERGRID", (0, 0), (-1, -1), 0.3, BORDER),
+    ("TOPPADDING", (0, 0), (-1, -1), 7),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 7),
+    ("LEFTPADDING", (0, 0), (-1, -1), 8),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+])
+
+_INSIGHT_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, -1), BG_CARD),
+    ("BOX", (0, 0), (-1, -1), 0.5, INDIGO),
+    ("LEFTPADDING", (0, 0), (-1, -1), 12),
+    ("TOPPADDING", (0, 0), (-1, -1), 6),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+])
+
+
+@lru_cache(maxsize=1)
 def _styles():
     base = getSampleStyleSheet()
     custom = {}
@@ -69,14 +170,9 @@ def _styles():
         "body_muted", parent=base["Normal"],
         fontSize=8, textColor=TEXT_MUTED, fontName="Helvetica",
     )
-    custom["kpi_value"] = ParagraphStyle(
-        "kpi_value", parent=base["Normal"],
-        fontSize=20, fontName="Helvetica-Bold", alignment=TA_CENTER,
-    )
-    custom["kpi_label"] = ParagraphStyle(
-        "kpi_label", parent=base["Normal"],
-        fontSize=8, textColor=TEXT_MUTED, fontName="Helvetica",
-        alignment=TA_CENTER,
+    custom["kpi_cell"] = ParagraphStyle(
+        "kpi_cell", parent=base["Normal"],
+        fontSize=20, leading=24, fontName="Helvetica-Bold", alignment=TA_CENTER,
     )
     custom["amount_green"] = ParagraphStyle(
         "amount_green", parent=base["Normal"],
@@ -91,42 +187,37 @@ def _styles():
     return custom
 
 
+
 def _kpi_table(total_in, total_out, net, styles):
     """3-column KPI summary table."""
-    net_color = GREEN if net >= 0 else RED
+    muted_hex = TEXT_MUTED.hexval()
 
-    def kpi_cell(value_str, label, color):
-        return [
-            Paragraph(f'<font color="{color.hexval()}">{value_str}</font>', styles["kpi_value"]),
-            Spacer(1, 2),
-            Paragraph(label, styles["kpi_label"]),
-        ]
+    def kpi_cell(value_str, label, font_open):
+        # One Paragraph per cell (value + label split by <br/>) instead of a
+        # (Paragraph, Spacer, Paragraph) sub-flow — one wrap() per cell
+        return Paragraph(
+            f'{font_open}<b>{value_str}</b>{FONT_CLOSE}'
+            f'<br/><font size="8" color="{muted_hex}">{label}</font>',
+            styles["kpi_cell"],
+        )
 
     data = [[
-        kpi_cell(f"{total_in:,.0f} SEK", "Total Income", GREEN),
-        kpi_cell(f"{total_out:,.0f} SEK", "Total Expenses", RED),
-        kpi_cell(f"{net:+,.0f} SEK", "Net Balance", net_color),
+        kpi_cell(f"{total_in:,.0f} SEK", "Total Income", _FONT_OPEN["green"]),
+        kpi_cell(f"{total_out:,.0f} SEK", "Total Expenses", _FONT_OPEN["red"]),
+        kpi_cell(f"{net:+,.0f} SEK", "Net Balance", _FONT_OPEN["green" if net >= 0 else "red"]),
     ]]
 
     t = Table(data, colWidths=[5.5 * cm, 5.5 * cm, 5.5 * cm])
-    t.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, -1), BG_CARD),
-        ("ROWBACKGROUNDS", (0, 0), (-1, -1), [BG_CARD]),
-        ("BOX", (0, 0), (-1, -1), 0.5, BORDER),
-        ("INNERGRID", (0, 0), (-1, -1), 0.5, BORDER),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("TOPPADDING", (0, 0), (-1, -1), 14),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 14),
-        ("LEFTPADDING", (0, 0), (-1, -1), 10),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-        ("ROUNDEDCORNERS", [6, 6, 6, 6]),
-    ]))
+    t.setStyle(_KPI_STYLE)
     return t
 
 
-def _category_breakdown_table(df_expenses, styles):
-    """Category breakdown with mini progress bars (text-based)."""
-    cat_sum = df_expenses.groupby("category")["amount"].sum().sort_values(ascending=False)
+def _category_breakdown_table(cat_sum, styles):
+    """Category breakdown with mini progress bars (text-based).
+
+    Takes the pre-aggregated per-category Series so the groupby over the
+    expense rows happens once per report, not once per table.
+    """
     total = cat_sum.sum()
 
     header = [
@@ -140,36 +231,25 @@ def _category_breakdown_table(df_expenses, styles):
     for cat, amount in cat_sum.items():
         pct = amount / total * 100 if total > 0 else 0
         icon = CATEGORY_ICONS.get(cat, "📦")
-        cat_color = colors.HexColor(CATEGORY_HEX.get(cat, "#6b7280"))
-        bar_filled = int(pct / 5)  # Max 20 chars = 100%
-        bar = "█" * bar_filled + "░" * (20 - bar_filled)
+        cat_color = CATEGORY_COLOR.get(cat, _DEFAULT_CAT_COLOR)
+        # 20 cells = 100%, clamped so float drift at the edges can't index
+        # past the lookup tables or shrink the empty run negative
+        bar_filled = 20 if pct >= 100 else (0 if pct < 0 else int(pct / 5))
 
         rows.append([
             Paragraph(f'{icon} {cat}', styles["body"]),
             Paragraph(f'{amount:,.0f}', styles["amount_red"]),
             Paragraph(f'{pct:.1f}%', ParagraphStyle("pct", parent=styles["body"],
                       textColor=cat_color, fontName="Helvetica-Bold", alignment=TA_CENTER)),
-            Paragraph(f'<font color="{cat_color.hexval()}">{bar[:bar_filled]}</font>'
-                     f'<font color="#334155">{bar[bar_filled:]}</font>', styles["body"]),
+            Paragraph(_CAT_FONT_OPEN.get(cat, _DEFAULT_CAT_FONT_OPEN) + _BAR_FULL[bar_filled] + FONT_CLOSE
+                      + _FONT_OPEN["border"] + _BAR_EMPTY[bar_filled] + FONT_CLOSE, styles["body"]),
         ])
 
-    t = Table(rows, colWidths=[4.5 * cm, 3.5 * cm, 2.5 * cm, 6 * cm])
-    t.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), INDIGO_DARK),
-        ("BACKGROUND", (0, 1), (-1, -1), BG_CARD),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [BG_CARD, colors.HexColor("#162032")]),
-        ("TEXTCOLOR", (0, 0), (-1, 0), TEXT_MAIN),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, 0), 8),
-        ("BOX", (0, 0), (-1, -1), 0.5, BORDER),
-        ("INNERGRID", (0, 0), (-1, -1), 0.3, BORDER),
-        ("TOPPADDING", (0, 0), (-1, -1), 7),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 7),
-        ("LEFTPADDING", (0, 0), (-1, -1), 8),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("ALIGN", (1, 0), (2, -1), "CENTER"),
-    ]))
+    # Fixed heights: ReportLab re-wraps and re-measures every Paragraph per
+    # row when heights are auto-computed, which grows painful with the data
+    row_heights = [0.7 * cm] + [0.55 * cm] * (len(rows) - 1)
+    t = Table(rows, colWidths=[4.5 * cm, 3.5 * cm, 2.5 * cm, 6 * cm], rowHeights=row_heights)
+    t.setStyle(_CAT_STYLE)
     return t
 
 
@@ -185,35 +265,31 @@ def _transactions_table(df, styles, max_rows=20):
     ]
     rows = [header]
 
-    for _, row in df.iterrows():
-        is_income = row["transaction_type"] == "income"
+    # Column arrays + zip — iterrows would box a Series per row
+    dates = df["transaction_date"].astype(str).fillna("").str.slice(0, 10).to_numpy()
+    descs = df["description"].astype(str).fillna("").str.slice(0, 45).to_numpy()
+    cats  = df["category"].to_numpy()
+    types = df["transaction_type"].to_numpy()
+    amts  = df["amount"].to_numpy(dtype=float)
+
+    # Date/description/category cells carry no markup — raw strings let the
+    # TableStyle column commands do the styling without a Paragraph (and its
+    # mini-XML parse) per cell; only the amount keeps per-row color markup
+    for tx_date, desc, cat, tx_type, amount in zip(dates, descs, cats, types, amts):
+        is_income = tx_type == "income"
         sign = "+" if is_income else "-"
         amount_style = styles["amount_green"] if is_income else styles["amount_red"]
-        icon = CATEGORY_ICONS.get(row["category"], "📦")
-        tx_date = str(row["transaction_date"])[:10]
+        icon = CATEGORY_ICONS.get(cat, "📦")
 
         rows.append([
-            Paragraph(tx_date, styles["body_muted"]),
-            Paragraph(str(row["description"])[:45], styles["body"]),
-            Paragraph(f'{icon} {row["category"]}', styles["body"]),
-            Paragraph(f'{sign}{float(row["amount"]):,.0f}', amount_style),
+            tx_date,
+            desc,
+            f'{icon} {cat}',
+            Paragraph(f'{sign}{amount:,.0f}', amount_style),
         ])
 
     t = Table(rows, colWidths=[2.5 * cm, 7.5 * cm, 3.5 * cm, 3 * cm])
-    t.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), INDIGO_DARK),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [BG_CARD, colors.HexColor("#162032")]),
-        ("TEXTCOLOR", (0, 0), (-1, 0), TEXT_MAIN),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, 0), 8),
-        ("BOX", (0, 0), (-1, -1), 0.5, BORDER),
-        ("INNERGRID", (0, 0), (-1, -1), 0.3, BORDER),
-        ("TOPPADDING", (0, 0), (-1, -1), 6),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-        ("LEFTPADDING", (0, 0), (-1, -1), 8),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-    ]))
+    t.setStyle(_TX_STYLE)
     return t
 
 
@@ -247,11 +323,24 @@ def generate_pdf_report(df: pd.DataFrame, month_label: str = None) -> bytes:
     story.append(HRFlowable(width="100%", thickness=1, color=INDIGO, spaceAfter=16))
 
     # ── KPI Summary ───────────────────────────────────────────
-    df_copy = df.copy()
-    df_copy["amount"] = pd.to_numeric(df_copy["amount"], errors="coerce").fillna(0)
-
-    total_in  = df_copy[df_copy["transaction_type"] == "income"]["amount"].sum()
-    total_out = df_copy[df_copy["transaction_type"] == "expense"]["amount"].sum()
+    # Slim working frame: only the five columns the report reads, with the
+    # caller's frame left untouched — no full-width copy
+    df_copy = pd.DataFrame({
+        "transaction_date": df["transaction_date"].to_numpy(),
+        "description":      df["description"].to_numpy(),
+        "amount":           pd.to_numeric(df["amount"], errors="coerce").fillna(0).to_numpy(),
+        "category":         df["category"].to_numpy(),
+        "transaction_type": df["transaction_type"].to_numpy(),
+    })
+    # ~10 distinct values each: categorical codes are 8x smaller than object
+    # arrays and every aggregation below hashes ints instead of strings
+    df_copy["category"] = df_copy["category"].astype("category")
+    df_copy["transaction_type"] = df_copy["transaction_type"].astype("category")
+
+    # One scan over the amount column yields both totals
+    sums = df_copy.groupby("transaction_type", sort=False, observed=True)["amount"].sum()
+    total_in  = float(sums.get("income", 0.0))
+    total_out = float(sums.get("expense", 0.0))
     net       = total_in - total_out
 
     story.append(Paragraph("📊 Summary", styles["section"]))
@@ -259,18 +348,42 @@ def generate_pdf_report(df: pd.DataFrame, month_label: str = None) -> bytes:
     story.append(Spacer(1, 0.5 * cm))
 
     # ── Category Breakdown ────────────────────────────────────
-    expenses = df_copy[df_copy["transaction_type"] == "expense"]
+    mask_exp = df_copy["transaction_type"].to_numpy() == "expense"
+    expenses = df_copy.loc[mask_exp]
+    # Aggregated once; the breakdown table and the insights both read it.
+    # factorize + bincount sums every row in a single C pass — the raw-row
+    # aggregation is the only part of this report that scales with data.
+    if not expenses.empty:
+        codes, cats = pd.factorize(expenses["category"].to_numpy())
+        sums = np.bincount(codes, weights=expenses["amount"].to_numpy(np.float64))
+        order = np.argsort(sums)[::-1]
+        cat_sum = pd.Series(sums[order], index=cats[order])
+    else:
+        cat_sum = pd.Series(dtype=float)
+    exp_total = cat_sum.sum()
     if not expenses.empty:
         story.append(Paragraph("💰 Expenses by Category", styles["section"]))
-        story.append(_category_breakdown_table(expenses, styles))
+        story.append(_category_breakdown_table(cat_sum, styles))
         story.append(Spacer(1, 0.5 * cm))
 
     # ── Monthly Summary ───────────────────────────────────────
-    df_copy["transaction_date"] = pd.to_datetime(df_copy["transaction_date"], errors="coerce")
-    df_copy["month"] = df_copy["transaction_date"].dt.to_period("M").astype(str)
-    monthly = df_copy.groupby(["month", "transaction_type"])["amount"].sum().unstack(fill_value=0).reset_index()
-
-    if not monthly.empty and "expense" in monthly.columns:
+    # Skip the O(N) string parse when the app already hands us datetimes;
+    # cache=True dedups repeated date strings when we do have to parse
+    if not pd.api.types.is_datetime64_any_dtype(df_copy["transaction_date"]):
+        df_copy["transaction_date"] = pd.to_datetime(df_copy["transaction_date"], errors="coerce", cache=True)
+    # datetime64[M]'s string repr is already "YYYY-MM" — no PeriodIndex round-trip
+    df_copy["month"] = df_copy["transaction_date"].to_numpy().astype("datetime64[M]").astype(str)
+    # sort=False skips the per-row group-key sort; the explicit sort_index
+    # afterward orders the handful of aggregated (month, type) keys — the
+    # "YYYY-MM" strings sort chronologically. observed=True keeps the
+    # categorical type column from materializing groups for types absent
+    # from this report.
+    monthly = (df_copy.groupby(["month", "transaction_type"], sort=False, observed=True)["amount"]
+               .sum().sort_index().unstack(fill_value=0).reset_index())
+
+    # A one-month (or undated) report's breakdown just repeats the KPI row —
+    # skip the whole table build in that case
+    if len(monthly) >= 2 and "expense" in monthly.columns:
         story.append(Paragraph("📅 Monthly Breakdown", styles["section"]))
 
         m_header = [
@@ -280,50 +393,42 @@ def generate_pdf_report(df: pd.DataFrame, month_label: str = None) -> bytes:
             Paragraph("Net (SEK)", styles["body_muted"]),
         ]
         m_rows = [m_header]
-        for _, mrow in monthly.iterrows():
-            inc = float(mrow.get("income", 0))
-            exp = float(mrow.get("expense", 0))
-            mn  = inc - exp
-            net_color_hex = GREEN.hexval() if mn >= 0 else RED.hexval()
+        # Columns out as arrays, nets as one vectorized subtraction — the
+        # loop stops hashing into a Series twice per row
+        months  = monthly["month"].to_numpy()
+        inc_arr = monthly["income"].to_numpy(dtype=float) if "income" in monthly.columns else np.zeros(len(monthly))
+        exp_arr = monthly["expense"].to_numpy(dtype=float) if "expense" in monthly.columns else np.zeros(len(monthly))
+        net_arr = inc_arr - exp_arr
+        net_style = ParagraphStyle("net", parent=styles["body"], fontName="Helvetica-Bold", alignment=TA_RIGHT)
+        for month, inc, exp, mn in zip(months, inc_arr, exp_arr, net_arr):
+            net_font_open = _FONT_OPEN["green"] if mn >= 0 else _FONT_OPEN["red"]
             m_rows.append([
-                Paragraph(str(mrow["month"]), styles["body"]),
+                Paragraph(str(month), styles["body"]),
                 Paragraph(f'{inc:,.0f}', styles["amount_green"]),
                 Paragraph(f'{exp:,.0f}', styles["amount_red"]),
-                Paragraph(
-                    f'<font color="{net_color_hex}">{mn:+,.0f}</font>',
-                    ParagraphStyle("net", parent=styles["body"], fontName="Helvetica-Bold", alignment=TA_RIGHT)
-                ),
+                Paragraph(f'{net_font_open}{mn:+,.0f}{FONT_CLOSE}', net_style),
             ])
 
-        mt = Table(m_rows, colWidths=[3.5 * cm, 4 * cm, 4.5 * cm, 4.5 * cm])
-        mt.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), INDIGO_DARK),
-            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [BG_CARD, colors.HexColor("#162032")]),
-            ("TEXTCOLOR", (0, 0), (-1, 0), TEXT_MAIN),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("FONTSIZE", (0, 0), (-1, 0), 8),
-            ("BOX", (0, 0), (-1, -1), 0.5, BORDER),
-            ("INNERGRID", (0, 0), (-1, -1), 0.3, BORDER),
-            ("TOPPADDING", (0, 0), (-1, -1), 7),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 7),
-            ("LEFTPADDING", (0, 0), (-1, -1), 8),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ]))
+        mt = Table(m_rows, colWidths=[3.5 * cm, 4 * cm, 4.5 * cm, 4.5 * cm],
+                   rowHeights=[0.7 * cm] + [0.55 * cm] * (len(m_rows) - 1))
+        mt.setStyle(_MONTH_STYLE)
         story.append(mt)
         story.append(Spacer(1, 0.5 * cm))
 
     # ── Recent Transactions ───────────────────────────────────
-    story.append(Paragraph("🕐 Recent Transactions (last 20)", styles["section"]))
-    story.append(_transactions_table(df_copy, styles))
-    story.append(Spacer(1, 0.5 * cm))
+    if not df_copy.empty:
+        story.append(Paragraph("🕐 Recent Transactions (last 20)", styles["section"]))
+        story.append(_transactions_table(df_copy, styles))
+        story.append(Spacer(1, 0.5 * cm))
 
     # ── Insights ──────────────────────────────────────────────
     if not expenses.empty:
         story.append(Paragraph("🧠 Key Insights", styles["section"]))
-        top_cat = expenses.groupby("category")["amount"].sum().idxmax()
-        top_pct = expenses.groupby("category")["amount"].sum().max() / expenses["amount"].sum() * 100
-        avg_tx  = expenses["amount"].mean()
+        # cat_sum is sorted descending — the top is position 0, no extra scan;
+        # a single category is 100% by definition
+        top_cat = cat_sum.index[0]
+        top_pct = 100.0 if len(cat_sum) == 1 else cat_sum.iat[0] / exp_total * 100
+        avg_tx  = exp_total / len(expenses)
         tx_count = len(df_copy)
 
         insight_data = [
@@ -333,13 +438,7 @@ def generate_pdf_report(df: pd.DataFrame, month_label: str = None) -> bytes:
             [Paragraph(f"• Net position: {'Surplus ✅' if net >= 0 else 'Deficit ⚠️'} {abs(net):,.0f} SEK", styles["body"])],
         ]
         it = Table(insight_data, colWidths=[16.5 * cm])
-        it.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, -1), BG_CARD),
-            ("BOX", (0, 0), (-1, -1), 0.5, INDIGO),
-            ("LEFTPADDING", (0, 0), (-1, -1), 12),
-            ("TOPPADDING", (0, 0), (-1, -1), 6),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-        ]))
+        it.setStyle(_INSIGHT_STYLE)
         story.append(it)
 
     # ── Footer ────────────────────────────────────────────────
@@ -352,4 +451,6 @@ def generate_pdf_report(df: pd.DataFrame, month_label: str = None) -> bytes:
     ))
 
     doc.build(story)
-    return buffer.getvalue()
+    # getbuffer() shares the BytesIO memory; one bytes() cast is the only copy
+    # (getvalue() would copy too, but keeps the internal buffer pinned as well)
+    return bytes(buffer.getbuffer())